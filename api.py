@@ -1,20 +1,37 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import asyncio
 import tempfile
 import shutil
 import time
+import aiofiles
 
 from rag_chatbot import RAGChatbot
 from config import Config
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the chatbot once per server process, at startup."""
+    try:
+        Config.validate()
+        app.state.chatbot = RAGChatbot()
+        print("✅ RAG Chatbot initialized successfully")
+    except Exception as e:
+        print(f"❌ Error initializing chatbot: {e}")
+        print("Please check your .env file and ensure GROQ_API_KEY is set correctly")
+        app.state.chatbot = None
+    yield
+
 # Initialize FastAPI app
 app = FastAPI(
     title="RAG Chatbot API",
     description="A Retrieval-Augmented Generation chatbot API using Groq AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -26,15 +43,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize chatbot
-try:
-    Config.validate()
-    chatbot = RAGChatbot()
-    print("✅ RAG Chatbot initialized successfully")
-except Exception as e:
-    print(f"❌ Error initializing chatbot: {e}")
-    print("Please check your .env file and ensure GROQ_API_KEY is set correctly")
-    chatbot = None
+def get_chatbot(request: Request) -> Optional[RAGChatbot]:
+    """Return the chatbot created at startup, or None if initialization failed."""
+    return getattr(request.app.state, "chatbot", None)
 
 # Pydantic models
 class ChatRequest(BaseModel):
@@ -63,19 +74,20 @@ async def root():
     return {"message": "RAG Chatbot API is running with Groq AI!"}
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, chatbot: Optional[RAGChatbot] = Depends(get_chatbot)):
     """Chat endpoint for asking questions."""
     if not chatbot:
         raise HTTPException(status_code=500, detail="Chatbot not initialized")
     
     try:
-        result = chatbot.chat(request.message, request.k)
+        # Run retrieval and the Groq call off the event loop
+        result = await asyncio.to_thread(chatbot.chat, request.message, request.k)
         return ChatResponse(**result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/upload-document", response_model=DocumentResponse)
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...), chatbot: Optional[RAGChatbot] = Depends(get_chatbot)):
     """Upload and process a document."""
     if not chatbot:
         raise HTTPException(status_code=500, detail="Chatbot not initialized")
@@ -90,44 +102,47 @@ async def upload_document(file: UploadFile = File(...)):
             detail=f"Unsupported file type. Allowed: {allowed_extensions}"
         )
     
-    # Check file size (limit to 10MB)
+    # Stream the upload to a temporary file in 64KB chunks, enforcing the
+    # 10MB limit as we go instead of buffering the whole body in memory
+    max_file_size = 10 * 1024 * 1024
     file_size = 0
-    content = await file.read()
-    file_size = len(content)
+    start_time = time.time()
     
-    if file_size > 10 * 1024 * 1024:  # 10MB limit
-        raise HTTPException(
-            status_code=400,
-            detail="File too large. Maximum size is 10MB."
-        )
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
+        temp_file_path = temp_file.name
     
     try:
-        start_time = time.time()
-        
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        async with aiofiles.open(temp_file_path, 'wb') as out_file:
+            while chunk := await file.read(1 << 16):
+                file_size += len(chunk)
+                if file_size > max_file_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="File too large. Maximum size is 10MB."
+                    )
+                await out_file.write(chunk)
         
         # Process the document
-        result = chatbot.add_document(temp_file_path)
+        result = await chatbot.a_add_document(temp_file_path)
         
         # Calculate processing time
         processing_time = time.time() - start_time
         
-        # Clean up temporary file
-        os.unlink(temp_file_path)
-        
         # Add processing time to result
         result['processing_time'] = round(processing_time, 2)
         
         return DocumentResponse(**result)
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Clean up temporary file
+        os.unlink(temp_file_path)
 
 @app.get("/stats", response_model=StatsResponse)
-async def get_stats():
+async def get_stats(chatbot: Optional[RAGChatbot] = Depends(get_chatbot)):
     """Get knowledge base statistics."""
     if not chatbot:
         raise HTTPException(status_code=500, detail="Chatbot not initialized")
@@ -139,19 +154,20 @@ async def get_stats():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/clear-knowledge-base")
-async def clear_knowledge_base():
+async def clear_knowledge_base(chatbot: Optional[RAGChatbot] = Depends(get_chatbot)):
     """Clear all documents from the knowledge base."""
     if not chatbot:
         raise HTTPException(status_code=500, detail="Chatbot not initialized")
     
     try:
-        result = chatbot.clear_knowledge_base()
+        # clear_all waits for pending disk writes, so keep it off the event loop
+        result = await asyncio.to_thread(chatbot.clear_knowledge_base)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/health")
-async def health_check():
+async def health_check(chatbot: Optional[RAGChatbot] = Depends(get_chatbot)):
     """Health check endpoint."""
     return {
         "status": "healthy",
@@ -11,15 +11,21 @@ class Config:
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
     LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+    # Local sentence-transformers backend: "onnx-int8" (quantized, CPU) or "torch"
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "onnx-int8")
+    # "auto" picks cuda, then mps, then cpu; or force one of them
+    EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "auto")
     
     # Vector Database Configuration
     CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./chroma_db")
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite")
     
     # Application Configuration - Optimized for speed
     MAX_TOKENS = int(os.getenv("MAX_TOKENS", "1000"))
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
-    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))  # Reduced from 1000
-    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))  # Reduced from 200
+    # Chunk sizes are measured in embedding-model tokens (MiniLM truncates at 256, larger sizes are capped)
+    CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "220"))
+    CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "30"))
     
     # Collection name for the vector database
     COLLECTION_NAME = "documents"
@@ -1,59 +1,293 @@
 import os
-from typing import List, Dict, Any
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
 from langchain.schema import Document
+from embedding_cache import EmbeddingCache
 from config import Config
 
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Dynamically quantized INT8 export shipped in the model repo (AVX2 kernels, runs on any x86-64)
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+def _select_device() -> str:
+    """Pick the embedding device: the configured one, else the fastest available."""
+    if Config.EMBEDDING_DEVICE != 'auto':
+        return Config.EMBEDDING_DEVICE
+    if torch.cuda.is_available():
+        return 'cuda'
+    if torch.backends.mps.is_available():
+        return 'mps'
+    return 'cpu'
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """LangChain embeddings backed directly by a SentenceTransformer model."""
+    
+    def __init__(self, model_name: str, device: str = 'cpu', normalize_embeddings: bool = True,
+                 backend: str = 'torch'):
+        # The INT8 export only has CPU kernels; accelerators run the torch model instead
+        if backend == 'onnx-int8' and device == 'cpu':
+            self.model = SentenceTransformer(
+                model_name,
+                device=device,
+                backend='onnx',
+                model_kwargs={'file_name': ONNX_INT8_FILE}
+            )
+        else:
+            backend = 'torch'
+            self.model = SentenceTransformer(
+                model_name,
+                device=device,
+                model_kwargs={'torch_dtype': torch.float16 if device == 'cuda' else torch.float32}
+            )
+        self.backend = backend
+        self.normalize_embeddings = normalize_embeddings
+        # Accelerators need larger batches to stay busy
+        self.batch_size = 64 if device == 'cpu' else 256
+    
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encode texts into a float32 matrix of shape (len(texts), dim)."""
+        return self.model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=self.normalize_embeddings,
+            show_progress_bar=False
+        )
+    
+    def token_lengths(self, texts: List[str]) -> List[int]:
+        """Return the number of tokens each text occupies in a model batch."""
+        return self.model.tokenizer(
+            texts,
+            add_special_tokens=False,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_length=True
+        )['length']
+    
+    def token_count(self, text: str) -> int:
+        """Return the number of tokens the model's tokenizer produces for a text."""
+        return len(self.model.tokenizer.encode(text, add_special_tokens=False))
+    
+    def length_sorted_batches(self, texts: List[str], batch_size: Optional[int] = None):
+        """Split texts into batches of similar length, returning the sort order too."""
+        batch_size = batch_size or self.batch_size
+        # Batches are padded per token, so sort on token counts rather than characters
+        order = np.argsort(self.token_lengths(texts), kind='stable')
+        batches = [
+            [texts[i] for i in order[start:start + batch_size]]
+            for start in range(0, len(texts), batch_size)
+        ]
+        return order, batches
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        
+        # Encode similar-length buckets so no batch is padded to an outlier
+        order, batches = self.length_sorted_batches(texts)
+        encoded = np.vstack([self.encode(batch, batch_size=len(batch)) for batch in batches])
+        embeddings = np.empty_like(encoded)
+        embeddings[order] = encoded
+        return embeddings.tolist()
+    
+    def embed_query(self, text: str) -> List[float]:
+        return self.encode([text])[0].tolist()
+
+_EMBEDDINGS = None
+_EMBEDDINGS_LOCK = threading.Lock()
+
+def get_shared_embeddings() -> SentenceTransformerEmbeddings:
+    """Return the process-wide embedding model, loading and warming it up once."""
+    global _EMBEDDINGS
+    with _EMBEDDINGS_LOCK:
+        if _EMBEDDINGS is None:
+            embeddings = SentenceTransformerEmbeddings(
+                model_name=EMBEDDING_MODEL_NAME,
+                device=_select_device(),
+                normalize_embeddings=True,
+                backend=Config.EMBEDDING_BACKEND
+            )
+            # Run one forward pass so the first real request hits warm weights
+            embeddings.embed_query("warmup")
+            _EMBEDDINGS = embeddings
+    return _EMBEDDINGS
+
+def _load_file(file_path: str) -> List[Document]:
+    """Load a PDF, TXT or MD file into LangChain documents."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+    
+    file_extension = os.path.splitext(file_path)[1].lower()
+    
+    if file_extension == '.pdf':
+        loader = PyPDFLoader(file_path)
+    elif file_extension in ['.txt', '.md']:
+        loader = TextLoader(file_path)
+    else:
+        raise ValueError(f"Unsupported file type: {file_extension}")
+    
+    return loader.load()
+
+def _chunk_sizes(max_tokens: int) -> Tuple[int, int]:
+    """Return the configured chunk size and overlap, capped at the tokens a chunk may use."""
+    if Config.CHUNK_SIZE <= 0:
+        raise ValueError(f"CHUNK_SIZE must be a positive number of tokens, got {Config.CHUNK_SIZE}")
+    
+    # Older configs gave sizes in characters; anything past the model limit would be truncated
+    chunk_size = min(Config.CHUNK_SIZE, max_tokens)
+    chunk_overlap = min(Config.CHUNK_OVERLAP, Config.CHUNK_OVERLAP * chunk_size // Config.CHUNK_SIZE)
+    return chunk_size, chunk_overlap
+
+def _make_text_splitter(length_function, max_tokens: int) -> RecursiveCharacterTextSplitter:
+    """Build the chunking splitter used for all documents."""
+    chunk_size, chunk_overlap = _chunk_sizes(max_tokens)
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=length_function,
+    )
+
+# Splitter for ingestion worker processes, which only need the tokenizer
+_WORKER_SPLITTER = None
+
+def _load_and_chunk(file_path: str, max_tokens: int) -> List[Document]:
+    """Load and chunk a single file. Runs in a worker process."""
+    global _WORKER_SPLITTER
+    if _WORKER_SPLITTER is None:
+        tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+        _WORKER_SPLITTER = _make_text_splitter(
+            lambda text: len(tokenizer.encode(text, add_special_tokens=False)),
+            max_tokens
+        )
+    return _WORKER_SPLITTER.split_documents(_load_file(file_path))
+
 class DocumentProcessor:
     """Handles document processing, chunking, and embedding."""
     
     def __init__(self):
-        # Use a smaller, faster embedding model
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=Config.CHUNK_SIZE,
-            chunk_overlap=Config.CHUNK_OVERLAP,
-            length_function=len,
+        # Use a smaller, faster embedding model, shared by all processors
+        self.embeddings = get_shared_embeddings()
+        # Chunks are measured without [CLS]/[SEP], so leave room for them in the model's window
+        model = self.embeddings.model
+        self.max_chunk_tokens = model.max_seq_length - model.tokenizer.num_special_tokens_to_add()
+        if Config.CHUNK_SIZE > self.max_chunk_tokens:
+            print(f"Warning: CHUNK_SIZE={Config.CHUNK_SIZE} exceeds the {self.max_chunk_tokens} tokens "
+                  f"the embedding model can take per chunk (sizes are in tokens, not characters); "
+                  f"using chunks of {_chunk_sizes(self.max_chunk_tokens)[0]} tokens")
+        self.text_splitter = _make_text_splitter(self.embeddings.token_count, self.max_chunk_tokens)
+        
+        # Persistent cache of chunk embeddings, so re-uploads skip the model
+        # Keyed by backend too, since INT8 vectors differ slightly from FP32 ones
+        self.embedding_cache = EmbeddingCache(
+            Config.EMBEDDING_CACHE_PATH,
+            f"{EMBEDDING_MODEL_NAME}:{self.embeddings.backend}"
         )
+        
+        # LRU cache of query embeddings keyed by the exact query string
+        self._query_emb_cache = OrderedDict()
+        self._query_emb_cache_size = 2048
+        self._query_emb_lock = threading.Lock()
     
     def load_document(self, file_path: str) -> List[Document]:
         """Load a document from file path."""
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"File not found: {file_path}")
-        
-        file_extension = os.path.splitext(file_path)[1].lower()
-        
-        if file_extension == '.pdf':
-            loader = PyPDFLoader(file_path)
-        elif file_extension in ['.txt', '.md']:
-            loader = TextLoader(file_path)
-        else:
-            raise ValueError(f"Unsupported file type: {file_extension}")
-        
-        return loader.load()
+        return _load_file(file_path)
     
     def chunk_documents(self, documents: List[Document]) -> List[Document]:
         """Split documents into chunks."""
         return self.text_splitter.split_documents(documents)
     
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Run the embedding model over a list of texts."""
+        # Sort by length so each batch is only padded to similar-length texts
+        order, batches = self.embeddings.length_sorted_batches(texts)
+        
+        # Tokenizing the next batch overlaps with the forward pass of the current one
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            encoded = list(executor.map(
+                lambda batch: self.embeddings.encode(batch, batch_size=len(batch)),
+                batches
+            ))
+        
+        # Restore the original text order
+        all_embeddings = np.empty((len(texts), encoded[0].shape[1]), dtype=np.float32)
+        all_embeddings[order] = np.vstack(encoded)
+        
+        return all_embeddings.tolist()
+    
+    async def _aencode(self, texts: List[str]) -> List[List[float]]:
+        """Run the embedding model over a list of texts, dispatching all batches concurrently."""
+        order, batches = self.embeddings.length_sorted_batches(texts)
+        tasks = [asyncio.to_thread(self.embeddings.encode, batch, len(batch)) for batch in batches]
+        encoded = await asyncio.gather(*tasks)
+        
+        # Restore the original text order
+        all_embeddings = np.empty((len(texts), encoded[0].shape[1]), dtype=np.float32)
+        all_embeddings[order] = np.vstack(encoded)
+        
+        return all_embeddings.tolist()
+    
+    def _lookup_cached(self, texts: List[str]):
+        """Hash texts and fetch cached vectors, returning the unique misses to embed."""
+        hashes = [EmbeddingCache.hash_text(text) for text in texts]
+        cached = self.embedding_cache.get_many(hashes)
+        misses = {h: text for h, text in zip(hashes, texts) if h not in cached}
+        return hashes, cached, misses
+    
+    def _store_computed(self, cached: Dict[str, Any], miss_hashes: List[str],
+                        computed: List[List[float]]) -> None:
+        """Persist newly computed vectors and merge them into the lookup result."""
+        self.embedding_cache.put_many(zip(miss_hashes, computed))
+        cached.update(zip(miss_hashes, computed))
+    
     def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of texts."""
-        # Process in smaller batches for better performance
-        batch_size = 32
-        all_embeddings = []
+        """Generate embeddings for a list of texts, reusing cached vectors."""
+        if not texts:
+            return []
+        
+        hashes, cached, misses = self._lookup_cached(texts)
+        if misses:
+            self._store_computed(cached, list(misses), self._encode(list(misses.values())))
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = self.embeddings.embed_documents(batch)
-            all_embeddings.extend(batch_embeddings)
+        return [np.asarray(cached[h], dtype=np.float32).tolist() for h in hashes]
+    
+    async def aget_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts without blocking the event loop."""
+        if not texts:
+            return []
+        
+        hashes, cached, misses = await asyncio.to_thread(self._lookup_cached, texts)
+        if misses:
+            computed = await self._aencode(list(misses.values()))
+            await asyncio.to_thread(self._store_computed, cached, list(misses), computed)
         
-        return all_embeddings
+        return [np.asarray(cached[h], dtype=np.float32).tolist() for h in hashes]
+    
+    def embed_query_cached(self, text: str) -> np.ndarray:
+        """Embed a query, reusing the cached vector for repeated queries."""
+        with self._query_emb_lock:
+            embedding = self._query_emb_cache.get(text)
+            if embedding is not None:
+                self._query_emb_cache.move_to_end(text)
+                return embedding
+        
+        embedding = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        with self._query_emb_lock:
+            self._query_emb_cache[text] = embedding
+            if len(self._query_emb_cache) > self._query_emb_cache_size:
+                self._query_emb_cache.popitem(last=False)
+        
+        return embedding
     
     def process_document(self, file_path: str) -> Dict[str, Any]:
         """Process a document: load, chunk, and generate embeddings."""
@@ -70,12 +304,41 @@ class DocumentProcessor:
         embeddings = self.get_embeddings(texts)
         
         # Prepare metadata
-        metadata_list = []
-        for chunk in chunks:
-            metadata = chunk.metadata.copy()
-            metadata['source'] = file_path
-            metadata['chunk_id'] = len(metadata_list)
-            metadata_list.append(metadata)
+        metadata_list = [
+            {**chunk.metadata, 'source': file_path, 'chunk_id': chunk_id}
+            for chunk_id, chunk in enumerate(chunks)
+        ]
+        
+        return {
+            'texts': texts,
+            'embeddings': embeddings,
+            'metadata': metadata_list,
+            'chunks': chunks
+        }
+    
+    def batch_process(self, file_paths: List[str]) -> Dict[str, Any]:
+        """Process several documents: load and chunk them in parallel, then embed all chunks together."""
+        if not file_paths:
+            return {'texts': [], 'embeddings': [], 'metadata': [], 'chunks': []}
+        
+        # PDF parsing and chunking are CPU-bound, so spread files over processes
+        max_workers = min(len(file_paths), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            chunks_per_file = list(executor.map(
+                _load_and_chunk, file_paths, [self.max_chunk_tokens] * len(file_paths)
+            ))
+        
+        chunks = [chunk for file_chunks in chunks_per_file for chunk in file_chunks]
+        texts = [chunk.page_content for chunk in chunks]
+        
+        # One embedding pass over every chunk gives larger, better-sorted batches
+        embeddings = self.get_embeddings(texts)
+        
+        metadata_list = [
+            {**chunk.metadata, 'source': file_path, 'chunk_id': chunk_id}
+            for file_path, file_chunks in zip(file_paths, chunks_per_file)
+            for chunk_id, chunk in enumerate(file_chunks)
+        ]
         
         return {
             'texts': texts,
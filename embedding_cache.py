@@ -0,0 +1,61 @@
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+class EmbeddingCache:
+    """Persistent SQLite cache of text embeddings keyed by the SHA-256 of the text.
+    
+    Vectors are stored as float16 to halve the on-disk size and returned as
+    float32. For unit-norm MiniLM vectors the cosine error is around 1e-4.
+    """
+    
+    def __init__(self, path: str, model: str):
+        self.model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, vec BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash))"
+        )
+        self._conn.commit()
+    
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Return the cache key for a text."""
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the given hashes, skipping misses."""
+        found = {}
+        unique_hashes = list(dict.fromkeys(hashes))
+        
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique_hashes), 500):
+                batch = unique_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM cache WHERE model = ? AND hash IN ({placeholders})",
+                    [self.model, *batch]
+                )
+                for text_hash, vec in rows:
+                    found[text_hash] = np.frombuffer(vec, dtype=np.float16).astype(np.float32)
+        
+        return found
+    
+    def put_many(self, items: Iterable[Tuple[str, np.ndarray]]) -> None:
+        """Store vectors under their hashes, keeping any existing entries."""
+        rows = [
+            (text_hash, self.model, np.asarray(vec, dtype=np.float16).tobytes())
+            for text_hash, vec in items
+        ]
+        
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache (hash, model, vec) VALUES (?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
@@ -1,14 +1,44 @@
+import asyncio
+import hashlib
+import string
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
 from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage, SystemMessage
 from document_processor import DocumentProcessor
-from vector_store_deploy import VectorStore
+from vector_store_deploy import VectorStore, get_shared_vector_store
+from semantic_cache import ProximityCache
 from config import Config
 
+def _compile_prompt(template: str):
+    """Parse a str.format template once into a function that only substitutes fields."""
+    parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+    
+    def render(**values: str) -> str:
+        return "".join([
+            literal + values[field] if field is not None else literal
+            for literal, field in parts
+        ])
+    
+    return render
+
 class RAGChatbot:
     """RAG-based chatbot that combines retrieval and generation."""
     
+    # System prompt for RAG, parsed once and shared by all instances. The
+    # question is sent once, as the user message, rather than also being
+    # interpolated here.
+    SYSTEM_PROMPT = """You are a helpful AI assistant that answers questions based on the provided context. 
+        Use the following context to answer the user's question. If the context doesn't contain enough information 
+        to answer the question, say so and provide a general helpful response.
+        
+        Context: {context}
+        
+        Answer:"""
+    
+    _render_system_prompt = staticmethod(_compile_prompt(SYSTEM_PROMPT))
+    
     def __init__(self, vector_store: VectorStore = None, document_processor: DocumentProcessor = None):
         # Validate configuration first
         Config.validate()
@@ -22,20 +52,29 @@ class RAGChatbot:
         
         # Initialize components if not provided
         self.document_processor = document_processor or DocumentProcessor()
-        self.vector_store = vector_store or VectorStore()
-        
-        # Define the system prompt for RAG
-        self.system_prompt = """You are a helpful AI assistant that answers questions based on the provided context. 
-        Use the following context to answer the user's question. If the context doesn't contain enough information 
-        to answer the question, say so and provide a general helpful response.
-        
-        Context: {context}
-        
-        Question: {question}
+        self.vector_store = vector_store or get_shared_vector_store()
         
-        Answer:"""
+        # Approximate cache of retrieved context, keyed by query embedding.
+        # Query embeddings are unit-normalized by the model, so the caches skip it.
+        self.context_cache = ProximityCache(capacity=1024, tau=0.05, normalize=False)
         
-        self.prompt_template = ChatPromptTemplate.from_template(self.system_prompt)
+        # LLM response caches: exact match on (query, context, KB version), then
+        # near-duplicate queries (cosine similarity >= 0.97) over the same context
+        self._resp_cache = OrderedDict()
+        self._resp_cache_size = 512
+        self._resp_cache_lock = threading.Lock()
+        self.response_cache = ProximityCache(capacity=1024, tau=0.03, normalize=False)
+        self._kb_version = 0
+        # Serializes cache writes against invalidation, so a turn that started before a
+        # knowledge base change can't repopulate the caches after they were cleared
+        self._kb_lock = threading.Lock()
+    
+    def _invalidate_caches(self) -> None:
+        """Drop cached contexts and responses after the knowledge base changes."""
+        with self._kb_lock:
+            self._kb_version += 1
+            self.context_cache.clear()
+            self.response_cache.clear()
     
     def add_document(self, file_path: str) -> Dict[str, Any]:
         """Add a document to the knowledge base."""
@@ -48,8 +87,46 @@ class RAGChatbot:
             for chunk in chunks:
                 chunk.metadata['source'] = file_path
             
+            # Embed through the processor so re-uploads reuse the persistent cache
+            embeddings = self.document_processor.get_embeddings(
+                [chunk.page_content for chunk in chunks]
+            )
+            
+            # Add to vector store
+            result = self.vector_store.add_documents(chunks, embeddings)
+            
+            # Cached contexts and responses no longer reflect the knowledge base
+            self._invalidate_caches()
+            
+            return result
+        
+        except Exception as e:
+            return {
+                'success': False,
+                'message': f'Error adding document: {str(e)}'
+            }
+    
+    async def a_add_document(self, file_path: str) -> Dict[str, Any]:
+        """Add a document to the knowledge base without blocking the event loop."""
+        try:
+            # Load and chunk the document
+            documents = await asyncio.to_thread(self.document_processor.load_document, file_path)
+            chunks = await asyncio.to_thread(self.document_processor.chunk_documents, documents)
+            
+            # Add source information to metadata
+            for chunk in chunks:
+                chunk.metadata['source'] = file_path
+            
+            # Embed all chunk batches concurrently
+            embeddings = await self.document_processor.aget_embeddings(
+                [chunk.page_content for chunk in chunks]
+            )
+            
             # Add to vector store
-            result = self.vector_store.add_documents(chunks)
+            result = await asyncio.to_thread(self.vector_store.add_documents, chunks, embeddings)
+            
+            # Cached contexts and responses no longer reflect the knowledge base
+            self._invalidate_caches()
             
             return result
         
@@ -61,33 +138,74 @@ class RAGChatbot:
     
     def get_relevant_context(self, query: str, k: int = 5) -> str:
         """Retrieve relevant context for a query."""
-        results = self.vector_store.similarity_search(query, k=k)
+        kb_version = self._kb_version
+        query_embedding = self.document_processor.embed_query_cached(query)
+        
+        # Near-duplicate queries reuse the context retrieved for the cached one
+        entry = self.context_cache.lookup(query_embedding)
+        if entry is not None and k in entry:
+            return entry[k]
+        
+        results = self.vector_store.similarity_search_by_vector(query_embedding.tolist(), k=k)
         
         if not results:
             return "No relevant context found."
         
         # Combine relevant contexts
-        context_parts = []
-        for doc in results:
-            context_parts.append(doc.page_content)
+        context = "\n\n".join([doc.page_content for doc in results])
         
-        return "\n\n".join(context_parts)
+        # Only cache if the knowledge base didn't change while we were retrieving
+        with self._kb_lock:
+            if self._kb_version == kb_version:
+                if entry is not None:
+                    entry[k] = context
+                else:
+                    self.context_cache.insert(query_embedding, {k: context})
+        
+        return context
     
     def generate_response(self, query: str, context: str) -> str:
-        """Generate a response using the LLM."""
+        """Generate a response using the LLM, reusing cached answers when possible."""
         try:
+            kb_version = self._kb_version
+            context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+            key = (query.strip().lower(), context_hash, kb_version)
+            
+            # Exact match on the normalized query and retrieved context
+            with self._resp_cache_lock:
+                response = self._resp_cache.get(key)
+                if response is not None:
+                    self._resp_cache.move_to_end(key)
+                    return response
+            
+            # Near-duplicate query answered from the same context
+            query_embedding = self.document_processor.embed_query_cached(query)
+            entry = self.response_cache.lookup(query_embedding)
+            if entry is not None and context_hash in entry:
+                return entry[context_hash]
+            
             # Create messages for the chat model
             messages = [
-                SystemMessage(content=self.system_prompt.format(
-                    context=context,
-                    question=query
-                )),
+                SystemMessage(content=self._render_system_prompt(context=context)),
                 HumanMessage(content=query)
             ]
             
             # Generate response
-            response = self.llm(messages)
-            return response.content
+            response = self.llm(messages).content
+            
+            # Only cache if the knowledge base didn't change while the LLM was answering
+            with self._kb_lock:
+                if self._kb_version == kb_version:
+                    with self._resp_cache_lock:
+                        self._resp_cache[key] = response
+                        if len(self._resp_cache) > self._resp_cache_size:
+                            self._resp_cache.popitem(last=False)
+                    if entry is not None:
+                        entry[context_hash] = response
+                    else:
+                        self.response_cache.insert(query_embedding, {context_hash: response})
+            
+            return response
         
         except Exception as e:
             return f"Error generating response: {str(e)}"
@@ -122,4 +240,5 @@ class RAGChatbot:
     
     def clear_knowledge_base(self) -> Dict[str, Any]:
         """Clear all documents from the knowledge base."""
+        self._invalidate_caches()
         return self.vector_store.clear_all()
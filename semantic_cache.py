@@ -0,0 +1,132 @@
+import threading
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+
+class ProximityCache:
+    """Approximate key-value cache keyed by query embeddings.
+
+    A lookup hits when the cosine distance between the query and the closest
+    cached key is within ``tau``. Least recently used entries are evicted once
+    the cache reaches ``capacity``.
+
+    Small caches scan every key with one GEMV. From ``lsh_min_capacity`` keys
+    upwards, a random-projection LSH index narrows each lookup to the keys
+    sharing a bucket with the query in at least one of ``num_tables`` tables.
+    """
+
+    def __init__(self, capacity: int = 1024, tau: float = 0.05, num_tables: int = 8,
+                 bits: int = 12, lsh_min_capacity: int = 1024, seed: int = 0,
+                 normalize: bool = True):
+        self.capacity = capacity
+        self.tau = tau
+        # Callers passing unit vectors can skip the per-call normalization
+        self.normalize = normalize
+        self.K = None  # (capacity, dim) C-contiguous float32, allocated on first insert
+        self.values: List[Any] = []
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        # LSH index, only used for large caches
+        self.use_lsh = capacity >= lsh_min_capacity
+        self.num_tables = num_tables
+        self.bits = bits
+        self._seed = seed
+        self._planes = None  # (num_tables * bits, dim) float32
+        self._bit_weights = 1 << np.arange(bits, dtype=np.int64)
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in range(num_tables)]
+        self._entry_buckets: List[Optional[np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def _normalize(self, embedding) -> np.ndarray:
+        """Return the embedding as a C-contiguous unit-length float32 vector."""
+        q = np.ascontiguousarray(embedding, dtype=np.float32)
+        if not self.normalize:
+            return q
+        norm = np.linalg.norm(q)
+        return q / norm if norm > 0 else q
+
+    def _touch(self, idx: int) -> None:
+        self._clock += 1
+        self._last_used[idx] = self._clock
+
+    def _hash(self, q: np.ndarray) -> np.ndarray:
+        """Return the bucket id of a unit vector in each LSH table."""
+        signs = (self._planes @ q > 0).reshape(self.num_tables, self.bits)
+        return signs @ self._bit_weights
+
+    def _candidates(self, q: np.ndarray) -> np.ndarray:
+        """Return the indices of cached keys that may be close to the query."""
+        if not self.use_lsh:
+            return np.arange(len(self.values))
+
+        candidates = set()
+        for table, bucket in enumerate(self._hash(q)):
+            candidates.update(self._buckets[table].get(int(bucket), ()))
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def _index(self, idx: int, q: np.ndarray) -> None:
+        """Record a key in the LSH tables, replacing any previous key at idx."""
+        if idx < len(self._entry_buckets):
+            for table, bucket in enumerate(self._entry_buckets[idx]):
+                self._buckets[table][int(bucket)].discard(idx)
+        else:
+            self._entry_buckets.append(None)
+
+        buckets = self._hash(q)
+        for table, bucket in enumerate(buckets):
+            self._buckets[table].setdefault(int(bucket), set()).add(idx)
+        self._entry_buckets[idx] = buckets
+
+    def lookup(self, embedding) -> Optional[Any]:
+        """Return the cached value for the nearest key, or None on a miss."""
+        q = self._normalize(embedding)
+        with self._lock:
+            if not self.values:
+                return None
+
+            candidates = self._candidates(q)
+            if candidates.size == 0:
+                return None
+
+            sims = self.K[candidates] @ q if self.use_lsh else self.K[:len(self.values)] @ q
+            best = int(np.argmax(sims))
+            if 1.0 - sims[best] <= self.tau:
+                idx = int(candidates[best])
+                self._touch(idx)
+                return self.values[idx]
+            return None
+
+    def insert(self, embedding, value: Any) -> None:
+        """Cache a value under the given embedding, evicting the LRU entry if full."""
+        q = self._normalize(embedding)
+        with self._lock:
+            if self.K is None:
+                self.K = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                if self.use_lsh:
+                    rng = np.random.default_rng(self._seed)
+                    self._planes = rng.standard_normal(
+                        (self.num_tables * self.bits, q.shape[0])
+                    ).astype(np.float32)
+
+            if len(self.values) == self.capacity:
+                idx = int(np.argmin(self._last_used))
+                self.values[idx] = value
+            else:
+                idx = len(self.values)
+                self.values.append(value)
+
+            self.K[idx] = q
+            if self.use_lsh:
+                self._index(idx, q)
+            self._touch(idx)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self.values = []
+            self._last_used[:] = 0
+            self._buckets = [{} for _ in range(self.num_tables)]
+            self._entry_buckets = []
@@ -1,8 +1,12 @@
 import streamlit as st
 import requests
-import json
+import orjson
 import os
+import threading
 from typing import Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import time
 
 # Page configuration
@@ -13,108 +17,154 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_css() -> str:
+    """Read the app stylesheet once per server process."""
+    with open(os.path.join(os.path.dirname(__file__), "style.css")) as f:
+        return f"<style>{f.read()}</style>"
+
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        text-align: center;
-        color: #1f77b4;
-        margin-bottom: 2rem;
-    }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-        border-left: 4px solid;
-    }
-    .user-message {
-        background-color: #1565c0;
-        border-left-color: #2196f3;
-        color: white;
-    }
-    .bot-message {
-        background-color: #7b1fa2;
-        border-left-color: #9c27b0;
-        color: white;
-    }
-    .context-box {
-        background-color: #424242;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #616161;
-        margin-top: 0.5rem;
-        color: white;
-    }
-    .stats-box {
-        background-color: #2e7d32;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #4caf50;
-        color: white;
-    }
-    .upload-info {
-        background-color: #f57c00;
-        padding: 0.5rem;
-        border-radius: 0.5rem;
-        border: 1px solid #ff9800;
-        margin-bottom: 1rem;
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.html(load_css())
 
 # API configuration
 API_BASE_URL = "http://localhost:8000"
 
+# Upload limits, mirroring the backend's checks
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+ALLOWED_EXTENSIONS = ['.pdf', '.txt', '.md']
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """Shared HTTP session, so connections to the backend are kept alive across reruns."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Shared thread pool for firing independent backend requests concurrently."""
+    return ThreadPoolExecutor(max_workers=4)
+
+class UncachedResult(Exception):
+    """Raised from a cached function so st.cache_data doesn't keep a failed result."""
+    
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error") or result.get("message") or result.get("response"))
+        self.result = result
+
+def cached_result(func, *args, **kwargs) -> Dict[str, Any]:
+    """Call a cached function, returning the failed result it declined to cache."""
+    try:
+        return func(*args, **kwargs)
+    except UncachedResult as e:
+        return e.result
+
+def submit(func) -> Future:
+    """Run a backend request on the shared executor, attached to the current script run."""
+    ctx = get_script_run_ctx()
+    
+    def run():
+        # Cached functions need the script run context, which pool threads don't inherit
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func()
+    
+    return get_executor().submit(run)
+
+def wait_for(future: Future) -> Dict[str, Any]:
+    """Wait for a backend request submitted to the executor."""
+    try:
+        return future.result()
+    except UncachedResult as e:
+        return e.result
+
 def make_api_request(endpoint: str, method: str = "GET", data: Dict = None, files: Dict = None) -> Dict[str, Any]:
     """Make API request to the backend."""
     try:
         url = f"{API_BASE_URL}{endpoint}"
+        session = get_session()
         
         if method == "GET":
-            response = requests.get(url)
+            response = session.get(url)
         elif method == "POST":
             if files:
-                response = requests.post(url, files=files)
+                response = session.post(url, files=files)
             else:
-                response = requests.post(url, json=data)
+                response = session.post(
+                    url,
+                    data=orjson.dumps(data),
+                    headers={"Content-Type": "application/json"}
+                )
         elif method == "DELETE":
-            response = requests.delete(url)
+            response = session.delete(url)
         else:
             return {"error": f"Unsupported method: {method}"}
         
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     
     except requests.exceptions.RequestException as e:
         return {"error": f"API request failed: {str(e)}"}
+    except orjson.JSONDecodeError as e:
+        return {"error": f"Invalid API response: {str(e)}"}
 
 def chat_with_bot(message: str, k: int = 5) -> Dict[str, Any]:
     """Send a chat message to the bot."""
     return make_api_request("/chat", method="POST", data={"message": message, "k": k})
 
+@st.cache_data(ttl=600)
+def ask_quick_question(question: str, k: int = 5) -> Dict[str, Any]:
+    """Send a canned quick question, reusing the answer on repeat clicks."""
+    response = chat_with_bot(question, k)
+    if not response.get("success"):
+        raise UncachedResult(response)
+    return response
+
+def refresh_cached_results() -> None:
+    """Drop cached results that depend on the knowledge base contents."""
+    get_stats.clear()
+    ask_quick_question.clear()
+
 def upload_document(file) -> Dict[str, Any]:
     """Upload a document to the knowledge base."""
-    files = {"file": file}
+    # Reject files the backend would refuse before sending any bytes
+    file_extension = os.path.splitext(file.name)[1].lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
+        return {"success": False, "message": f"Unsupported file type. Allowed: {ALLOWED_EXTENSIONS}"}
+    if file.size > MAX_UPLOAD_SIZE:
+        return {"success": False, "message": "File too large. Maximum size is 10MB."}
+    
+    file.seek(0)
+    files = {"file": (file.name, file, file.type)}
     return make_api_request("/upload-document", method="POST", files=files)
 
+@st.cache_data(ttl=30)
 def get_stats() -> Dict[str, Any]:
     """Get knowledge base statistics."""
-    return make_api_request("/stats")
+    stats = make_api_request("/stats")
+    if "error" in stats:
+        raise UncachedResult(stats)
+    return stats
 
 def clear_knowledge_base() -> Dict[str, Any]:
     """Clear the knowledge base."""
     return make_api_request("/clear-knowledge-base", method="DELETE")
 
+@st.cache_data(ttl=10)
 def check_health() -> Dict[str, Any]:
     """Check API health."""
-    return make_api_request("/health")
+    health = make_api_request("/health")
+    if health.get("status") != "healthy":
+        raise UncachedResult(health)
+    return health
+
+# Chat history keeps only the most recent messages
+MAX_CHAT_MESSAGES = 200
 
 # Initialize session state
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = deque(maxlen=MAX_CHAT_MESSAGES)
 
 if "stats" not in st.session_state:
     st.session_state.stats = {"total_documents": 0}
@@ -126,8 +176,10 @@ st.markdown('<h1 class="main-header">🤖 RAG Chatbot (Groq AI)</h1>', unsafe_al
 with st.sidebar:
     st.header("📚 Knowledge Base")
     
-    # Health check
-    health = check_health()
+    # Health check and stats are independent, so fetch them concurrently
+    health_future = submit(check_health)
+    stats_future = submit(get_stats)
+    health = wait_for(health_future)
     if health.get("status") == "healthy":
         st.success("✅ API Connected")
     else:
@@ -156,7 +208,7 @@ with st.sidebar:
     
     if uploaded_file is not None:
         # Show file info
-        file_size = len(uploaded_file.getvalue()) / (1024 * 1024)  # MB
+        file_size = uploaded_file.size / (1024 * 1024)  # MB
         st.info(f"📄 File: {uploaded_file.name} ({file_size:.2f} MB)")
         
         if st.button("📤 Upload Document"):
@@ -182,7 +234,8 @@ with st.sidebar:
                     if result.get("processing_time"):
                         st.info(f"⏱️ Processing time: {result['processing_time']} seconds")
                     # Refresh stats
-                    st.session_state.stats = get_stats()
+                    refresh_cached_results()
+                    stats_future = submit(get_stats)
                 else:
                     st.error(f"❌ {result.get('message', 'Upload failed')}")
                 
@@ -192,7 +245,7 @@ with st.sidebar:
     
     # Knowledge base stats
     st.subheader("📊 Statistics")
-    stats = get_stats()
+    stats = wait_for(stats_future)
     if stats.get("total_documents") is not None:
         st.metric("Total Documents", stats["total_documents"])
         st.session_state.stats = stats
@@ -205,13 +258,17 @@ with st.sidebar:
                 result = clear_knowledge_base()
                 if result.get("success"):
                     st.success("✅ Knowledge base cleared")
-                    st.session_state.stats = get_stats()
+                    refresh_cached_results()
+                    st.session_state.stats = cached_result(get_stats)
                 else:
                     st.error(f"❌ {result.get('message', 'Failed to clear')}")
     
     # Settings
     st.subheader("⚙️ Settings")
-    k_value = st.slider("Number of context chunks (k)", 1, 10, 5, help="Number of relevant document chunks to retrieve")
+    # A form commits k once on Apply instead of rerunning on every drag tick
+    with st.form("settings", clear_on_submit=False):
+        k_value = st.slider("Number of context chunks (k)", 1, 10, 5, key="k", help="Number of relevant document chunks to retrieve")
+        st.form_submit_button("Apply")
 
 # Main chat area
 col1, col2 = st.columns([2, 1])
@@ -221,29 +278,13 @@ with col1:
     
     # Display chat messages
     for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <strong>You:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message bot-message">
-                <strong>Bot:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
             
             # Show context if available
             if message.get("context"):
                 with st.expander("🔍 View Context"):
-                    st.markdown(f"""
-                    <div class="context-box">
-                        {message["context"]}
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.code(message["context"], language=None)
     
     # Chat input
     if prompt := st.chat_input("Ask me anything..."):
@@ -287,7 +328,7 @@ with col2:
         if st.button(question, key=f"quick_{question}"):
             st.session_state.messages.append({"role": "user", "content": question})
             with st.spinner("🤔 Thinking..."):
-                response = chat_with_bot(question, k_value)
+                response = cached_result(ask_quick_question, question, k_value)
                 if response.get("success"):
                     bot_message = {
                         "role": "assistant",
@@ -305,7 +346,7 @@ with col2:
     
     # Clear chat
     if st.button("🗑️ Clear Chat", type="secondary"):
-        st.session_state.messages = []
+        st.session_state.messages = deque(maxlen=MAX_CHAT_MESSAGES)
         st.rerun()
 
 # Footer
@@ -3,6 +3,7 @@ import os
 import tempfile
 import time
 from typing import Dict, Any
+from collections import deque
 import shutil
 
 # Check for required environment variables
@@ -36,7 +37,7 @@ st.success("✅ GROQ_API_KEY is properly configured!")
 # Import our backend modules
 from config import Config
 from document_processor import DocumentProcessor
-from vector_store_deploy import VectorStore
+from vector_store_deploy import get_shared_vector_store
 from rag_chatbot import RAGChatbot
 
 # Page configuration
@@ -47,57 +48,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource
+def load_css() -> str:
+    """Read the app stylesheet once per server process."""
+    with open(os.path.join(os.path.dirname(__file__), "style.css")) as f:
+        return f"<style>{f.read()}</style>"
+
 # Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        text-align: center;
-        color: #1f77b4;
-        margin-bottom: 2rem;
-    }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-        border-left: 4px solid;
-    }
-    .user-message {
-        background-color: #1565c0;
-        border-left-color: #2196f3;
-        color: white;
-    }
-    .bot-message {
-        background-color: #7b1fa2;
-        border-left-color: #9c27b0;
-        color: white;
-    }
-    .context-box {
-        background-color: #424242;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #616161;
-        margin-top: 0.5rem;
-        color: white;
-    }
-    .stats-box {
-        background-color: #2e7d32;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border: 1px solid #4caf50;
-        color: white;
-    }
-    .upload-info {
-        background-color: #f57c00;
-        padding: 0.5rem;
-        border-radius: 0.5rem;
-        border: 1px solid #ff9800;
-        margin-bottom: 1rem;
-        color: white;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.html(load_css())
 
 # Initialize components
 @st.cache_resource
@@ -108,7 +66,7 @@ def initialize_components():
         Config.validate()
         
         # Initialize components
-        vector_store = VectorStore()
+        vector_store = get_shared_vector_store()
         document_processor = DocumentProcessor()
         chatbot = RAGChatbot(vector_store, document_processor)
         return chatbot, vector_store
@@ -116,9 +74,12 @@ def initialize_components():
         st.error(f"Failed to initialize components: {str(e)}")
         return None, None
 
+# Chat history keeps only the most recent messages
+MAX_CHAT_MESSAGES = 200
+
 # Initialize session state
 if "messages" not in st.session_state:
-    st.session_state.messages = []
+    st.session_state.messages = deque(maxlen=MAX_CHAT_MESSAGES)
 
 if "stats" not in st.session_state:
     st.session_state.stats = {"total_documents": 0}
@@ -131,6 +92,41 @@ if chatbot is None:
     st.info("Make sure you have set the GROQ_API_KEY in your Streamlit Cloud secrets.")
     st.stop()
 
+class UncachedResult(Exception):
+    """Raised from a cached function so st.cache_data doesn't keep a failed result."""
+    
+    def __init__(self, result: Dict[str, Any]):
+        super().__init__(result.get("error") or result.get("message") or result.get("response"))
+        self.result = result
+
+def cached_result(func, *args, **kwargs) -> Dict[str, Any]:
+    """Call a cached function, returning the failed result it declined to cache."""
+    try:
+        return func(*args, **kwargs)
+    except UncachedResult as e:
+        return e.result
+
+@st.cache_data(ttl=30)
+def get_stats() -> Dict[str, Any]:
+    """Get knowledge base statistics, cached across reruns."""
+    stats = vector_store.get_stats()
+    if "error" in stats:
+        raise UncachedResult(stats)
+    return stats
+
+@st.cache_data(ttl=600)
+def ask_quick_question(question: str, k: int = 5) -> Dict[str, Any]:
+    """Answer a canned quick question, reusing the answer on repeat clicks."""
+    response = chatbot.chat(question, k=k)
+    if not response.get("success"):
+        raise UncachedResult(response)
+    return response
+
+def refresh_cached_results() -> None:
+    """Drop cached results that depend on the knowledge base contents."""
+    get_stats.clear()
+    ask_quick_question.clear()
+
 # Main header
 st.markdown('<h1 class="main-header">🤖 RAG Chatbot (Groq AI)</h1>', unsafe_allow_html=True)
 
@@ -141,7 +137,7 @@ with st.sidebar:
     # Health check
     try:
         # Simple health check
-        stats = vector_store.get_stats()
+        stats = cached_result(get_stats)
         st.success("✅ System Ready")
     except Exception as e:
         st.error(f"❌ System Error: {str(e)}")
@@ -169,7 +165,7 @@ with st.sidebar:
     
     if uploaded_file is not None:
         # Show file info
-        file_size = len(uploaded_file.getvalue()) / (1024 * 1024)  # MB
+        file_size = uploaded_file.size / (1024 * 1024)  # MB
         st.info(f"📄 File: {uploaded_file.name} ({file_size:.2f} MB)")
         
         if st.button("📤 Upload Document"):
@@ -187,8 +183,10 @@ with st.sidebar:
                         progress_bar.progress(20)
                         
                         # Save uploaded file temporarily
+                        # Copy in 1MB blocks rather than materializing the whole file
+                        uploaded_file.seek(0)
                         with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as temp_file:
-                            temp_file.write(uploaded_file.getvalue())
+                            shutil.copyfileobj(uploaded_file, temp_file, length=1024 * 1024)
                             temp_file_path = temp_file.name
                         
                         progress_bar.progress(40)
@@ -211,7 +209,8 @@ with st.sidebar:
                                 st.info(f"📊 Created {result['chunks_created']} chunks")
                             st.info(f"⏱️ Processing time: {processing_time:.2f} seconds")
                             # Refresh stats
-                            st.session_state.stats = vector_store.get_stats()
+                            refresh_cached_results()
+                            st.session_state.stats = cached_result(get_stats)
                         else:
                             st.error(f"❌ {result.get('message', 'Upload failed')}")
                     
@@ -226,7 +225,7 @@ with st.sidebar:
     # Knowledge base stats
     st.subheader("📊 Statistics")
     try:
-        stats = vector_store.get_stats()
+        stats = cached_result(get_stats)
         if stats.get("total_documents") is not None:
             st.metric("Total Documents", stats["total_documents"])
             st.session_state.stats = stats
@@ -239,10 +238,11 @@ with st.sidebar:
         if st.checkbox("I understand this will delete all documents"):
             with st.spinner("Clearing knowledge base..."):
                 try:
-                    result = vector_store.clear_all()
+                    result = chatbot.clear_knowledge_base()
                     if result.get("success"):
                         st.success("✅ Knowledge base cleared")
-                        st.session_state.stats = vector_store.get_stats()
+                        refresh_cached_results()
+                        st.session_state.stats = cached_result(get_stats)
                     else:
                         st.error(f"❌ {result.get('message', 'Failed to clear')}")
                 except Exception as e:
@@ -250,7 +250,10 @@ with st.sidebar:
     
     # Settings
     st.subheader("⚙️ Settings")
-    k_value = st.slider("Number of context chunks (k)", 1, 10, 5, help="Number of relevant document chunks to retrieve")
+    # A form commits k once on Apply instead of rerunning on every drag tick
+    with st.form("settings", clear_on_submit=False):
+        k_value = st.slider("Number of context chunks (k)", 1, 10, 5, key="k", help="Number of relevant document chunks to retrieve")
+        st.form_submit_button("Apply")
 
 # Main chat area
 col1, col2 = st.columns([2, 1])
@@ -260,29 +263,13 @@ with col1:
     
     # Display chat messages
     for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="chat-message user-message">
-                <strong>You:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="chat-message bot-message">
-                <strong>Bot:</strong><br>
-                {message["content"]}
-            </div>
-            """, unsafe_allow_html=True)
+        with st.chat_message(message["role"]):
+            st.write(message["content"])
             
             # Show context if available
             if message.get("context"):
                 with st.expander("🔍 View Context"):
-                    st.markdown(f"""
-                    <div class="context-box">
-                        {message["context"]}
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.code(message["context"], language=None)
     
     # Chat input
     if prompt := st.chat_input("Ask me anything..."):
@@ -334,7 +321,7 @@ with col2:
             st.session_state.messages.append({"role": "user", "content": question})
             with st.spinner("🤔 Thinking..."):
                 try:
-                    response = chatbot.chat(question, k=k_value)
+                    response = cached_result(ask_quick_question, question, k=k_value)
                     if response.get("success"):
                         bot_message = {
                             "role": "assistant",
@@ -358,7 +345,7 @@ with col2:
     
     # Clear chat
     if st.button("🗑️ Clear Chat", type="secondary"):
-        st.session_state.messages = []
+        st.session_state.messages = deque(maxlen=MAX_CHAT_MESSAGES)
         st.rerun()
 
 # Footer
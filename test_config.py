@@ -4,6 +4,7 @@ Test script to verify configuration and components work properly.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from config import Config
 
 def test_config():
@@ -64,12 +65,16 @@ def test_components():
     
     try:
         from document_processor import DocumentProcessor
-        from vector_store_deploy import VectorStore
+        from vector_store_deploy import get_shared_vector_store
         from rag_chatbot import RAGChatbot
         
-        # Initialize components
-        doc_processor = DocumentProcessor()
-        vector_store = VectorStore()
+        # Initialize components; model loading and storage setup are
+        # independent, so run them in parallel
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            doc_processor_future = executor.submit(DocumentProcessor)
+            vector_store_future = executor.submit(get_shared_vector_store)
+            doc_processor = doc_processor_future.result()
+            vector_store = vector_store_future.result()
         chatbot = RAGChatbot(vector_store, doc_processor)
         
         print("✅ All components initialized successfully")
@@ -1,19 +1,33 @@
 import os
+import uuid
+import sqlite3
+import functools
 from typing import List, Dict, Any, Optional
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
+from document_processor import get_shared_embeddings
 from config import Config
 
+def _enable_wal(db_path: str) -> None:
+    """Switch Chroma's SQLite file to WAL so batched adds don't each wait on a full sync."""
+    # journal_mode is stored in the database file, so it sticks for Chroma's own connections
+    try:
+        conn = sqlite3.connect(os.path.join(db_path, "chroma.sqlite3"))
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass  # keep Chroma's default journal if the file is locked
+
 class VectorStore:
     """Handles vector database operations using ChromaDB."""
     
     def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
+        # Process-wide embedding model, so new stores don't reload MiniLM
+        self.embeddings = get_shared_embeddings()
         
         # Ensure the database directory exists
         os.makedirs(Config.CHROMA_DB_PATH, exist_ok=True)
@@ -23,6 +37,7 @@ class VectorStore:
             path=Config.CHROMA_DB_PATH,
             settings=Settings(anonymized_telemetry=False)
         )
+        _enable_wal(Config.CHROMA_DB_PATH)
         
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
@@ -30,48 +45,66 @@ class VectorStore:
             metadata={"hnsw:space": "cosine"}
         )
         
-        # Initialize LangChain vector store
-        self.vectorstore = Chroma(
-            client=self.client,
-            collection_name=Config.COLLECTION_NAME,
-            embedding_function=self.embeddings
-        )
+        # LangChain vector store, only built if similarity_search is used
+        self._vectorstore = None
+        
+        # Query embeddings memoized by query string, shared by both search paths
+        self._cached_embed = functools.lru_cache(maxsize=512)(self._embed_query)
+    
+    @property
+    def vectorstore(self) -> Chroma:
+        """LangChain wrapper around the collection, created on first access."""
+        if self._vectorstore is None:
+            self._vectorstore = Chroma(
+                client=self.client,
+                collection_name=Config.COLLECTION_NAME,
+                embedding_function=self.embeddings
+            )
+        return self._vectorstore
+    
+    def _embed_query(self, query: str) -> tuple:
+        """Embed a query once; a tuple so the result is hashable and immutable."""
+        return tuple(self.embeddings.embed_query(query))
     
     def add_documents(self, texts: List[str], metadata: List[Dict[str, Any]]) -> None:
         """Add documents to the vector store."""
         if len(texts) != len(metadata):
             raise ValueError("Number of texts must match number of metadata entries")
         
-        # Add to ChromaDB collection
-        ids = [f"doc_{i}" for i in range(len(texts))]
-        self.collection.add(
-            documents=texts,
-            metadatas=metadata,
-            ids=ids
-        )
+        # Unique IDs, so later uploads don't overwrite earlier chunks
+        ids = [uuid.uuid4().hex for _ in texts]
+        
+        # Add to ChromaDB collection in batches to bound embedding memory
+        batch_size = 64
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            self.collection.add(
+                documents=batch,
+                embeddings=self.embeddings.embed_documents(batch),
+                metadatas=metadata[i:i + batch_size],
+                ids=ids[i:i + batch_size]
+            )
     
-    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents."""
+    def search(self, query: str, k: int = 5) -> Dict[str, Any]:
+        """Search for similar documents, returned as parallel texts/metadatas/distances."""
         results = self.collection.query(
-            query_texts=[query],
+            query_embeddings=[list(self._cached_embed(query))],
             n_results=k
         )
         
-        # Format results
-        formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
-                formatted_results.append({
-                    'text': doc,
-                    'metadata': results['metadatas'][0][i] if results['metadatas'] and results['metadatas'][0] else {},
-                    'distance': results['distances'][0][i] if results['distances'] and results['distances'][0] else None
-                })
-        
-        return formatted_results
+        # Hand back Chroma's parallel lists as-is instead of building a dict per hit
+        texts = results['documents'][0] if results['documents'] else []
+        metadatas = results['metadatas'][0] if results['metadatas'] else [{} for _ in texts]
+        distances = results['distances'][0] if results['distances'] else []
+        return {
+            'texts': texts,
+            'metadatas': metadatas,
+            'distances': np.asarray(distances, dtype=np.float32)
+        }
     
     def similarity_search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
         """Perform similarity search using LangChain."""
-        docs = self.vectorstore.similarity_search(query, k=k)
+        docs = self.vectorstore.similarity_search_by_vector(list(self._cached_embed(query)), k=k)
         
         results = []
         for doc in docs:
@@ -92,13 +125,7 @@ class VectorStore:
     
     def clear_collection(self) -> None:
         """Clear all documents from the collection."""
-        self.client.delete_collection(Config.COLLECTION_NAME)
-        self.collection = self.client.create_collection(
-            name=Config.COLLECTION_NAME,
-            metadata={"hnsw:space": "cosine"}
-        )
-        self.vectorstore = Chroma(
-            client=self.client,
-            collection_name=Config.COLLECTION_NAME,
-            embedding_function=self.embeddings
-        )
+        # Delete rows in place, keeping the collection and its wrapper alive
+        all_ids = self.collection.get(include=[])['ids']
+        if all_ids:
+            self.collection.delete(ids=all_ids)
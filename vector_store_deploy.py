@@ -1,86 +1,447 @@
 import os
-import pickle
+import glob
+import queue
+import atexit
+import shutil
+import hashlib
+import functools
 import tempfile
+import threading
 from typing import List, Dict, Any, Optional
+import faiss
+import numpy as np
+import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain.schema import Document
+from document_processor import get_shared_embeddings
 from config import Config
 
+# Simple file-based storage for deployment
+DOCS_DIR = os.path.join(tempfile.gettempdir(), "rag_chatbot_docs")
+INDEX_DIR = os.path.join(tempfile.gettempdir(), "rag_chatbot_faiss")
+INDEX_FILE = os.path.join(INDEX_DIR, "index.faiss")
+INDEX_IDS_FILE = os.path.join(INDEX_DIR, "ids.json")
+
+# all-MiniLM-L6-v2 always yields unit-length 384-dim vectors, so indexes are built for that
+EMBED_DIM = 384
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Below this many vectors IVF-PQ can't be trained well and the graph index is small enough
+IVFPQ_MIN_VECTORS = 20000
+PQ_SUBQUANTIZERS = 64
+PQ_BITS = 8
+
+# Shards are the write-ahead log; the index is only checkpointed once the unsaved tail
+# reaches this size or the size of the last checkpoint, so total bytes written stay O(N)
+INDEX_CHECKPOINT_MIN = 1000
+
+def _content_hash(text: str) -> bytes:
+    """Return a short digest identifying a chunk's text."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def _make_index() -> faiss.Index:
+    """HNSW graph over float16 vectors, searched by inner product."""
+    # Embeddings are unit length, so inner product ranks exactly like cosine
+    index = faiss.IndexHNSWSQ(EMBED_DIM, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+def _build_ivfpq(vectors: np.ndarray) -> faiss.Index:
+    """Train an IVF-PQ index on the given vectors and add them to it."""
+    nlist = int(np.sqrt(len(vectors)))
+    quantizer = faiss.IndexFlatIP(EMBED_DIM)
+    index = faiss.IndexIVFPQ(
+        quantizer, EMBED_DIM, nlist, PQ_SUBQUANTIZERS, PQ_BITS, faiss.METRIC_INNER_PRODUCT
+    )
+    index.train(vectors)
+    index.add(vectors)
+    index.nprobe = max(1, nlist // 16)
+    return index
+
 class VectorStore:
     """Vector store for document embeddings using FAISS (deployment-friendly)."""
     
     def __init__(self):
         """Initialize the vector store."""
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'}
-        )
+        # Same (quantized) model the document processor embeds chunks and queries with
+        self.embeddings = get_shared_embeddings()
         self.vectorstore = None
         self.documents = []
+        self._source_files = set()
+        self._seen_hashes = set()
+        self._num_shards = 0
+        self._trained_size = 0
+        self._unsaved = 0
+        self._closed = False
         self._load_existing_data()
+        
+        # Query embeddings memoized by normalized query string
+        self._cached_embed = functools.lru_cache(maxsize=1024)(self._embed_query)
+        
+        # Persistence runs on a background writer so adds don't wait on disk I/O
+        self._index_lock = threading.Lock()
+        self._save_queue = queue.Queue()
+        # Held while files are written or removed; clear_all bumps the generation under
+        # it so writes queued before a clear are dropped instead of landing afterwards
+        self._persist_lock = threading.Lock()
+        self._generation = 0
+        threading.Thread(target=self._writer, daemon=True).start()
+        atexit.register(self.close)
     
     def _load_existing_data(self):
         """Load existing data from temporary storage."""
         try:
-            # Use a simple file-based storage for deployment
-            storage_file = os.path.join(tempfile.gettempdir(), "rag_chatbot_data.pkl")
-            if os.path.exists(storage_file):
-                with open(storage_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.documents = data.get('documents', [])
-                    if self.documents:
-                        # Recreate FAISS index
-                        texts = [doc.page_content for doc in self.documents]
-                        metadatas = [doc.metadata for doc in self.documents]
-                        self.vectorstore = FAISS.from_texts(
-                            texts, 
-                            self.embeddings, 
-                            metadatas=metadatas
-                        )
+            shards = sorted(glob.glob(os.path.join(DOCS_DIR, "docs_*.parquet")))
+            if shards:
+                # Keep numbering after existing shards even if reading them fails
+                self._num_shards = len(shards)
+                columns = pa.concat_tables([pq.read_table(shard) for shard in shards]).to_pydict()
+                self.documents = [
+                    Document(page_content=text, metadata=orjson.loads(metadata))
+                    for text, metadata in zip(columns['text'], columns['metadata'])
+                ]
+                self._source_files = {source for source in columns['source'] if source is not None}
+                self._seen_hashes = set(columns['hash'])
+                if self.documents:
+                    # Reuse the saved index; only re-embed if it is missing or stale
+                    self.vectorstore = self._read_index()
+                    if self.vectorstore is not None:
+                        self._replay_tail(shards)
+                    if self.vectorstore is None or self.vectorstore.index.ntotal != len(self.documents):
+                        self.vectorstore = self._new_vectorstore()
+                        if not self._add_saved_vectors(shards, 0):
+                            texts = [doc.page_content for doc in self.documents]
+                            metadatas = [doc.metadata for doc in self.documents]
+                            embeddings = self.embeddings.embed_documents(texts)
+                            self.vectorstore.add_embeddings(zip(texts, embeddings), metadatas=metadatas)
+                        self._write_index(self._snapshot_index(self.vectorstore))
+                    if isinstance(self.vectorstore.index, faiss.IndexIVFPQ):
+                        self._trained_size = self.vectorstore.index.ntotal
         except Exception as e:
             print(f"Warning: Could not load existing data: {e}")
             self.documents = []
+            self._source_files = set()
+            self._seen_hashes = set()
+            self.vectorstore = None
     
-    def _save_data(self):
-        """Save data to temporary storage."""
-        try:
-            storage_file = os.path.join(tempfile.gettempdir(), "rag_chatbot_data.pkl")
-            data = {
-                'documents': self.documents
-            }
-            with open(storage_file, 'wb') as f:
-                pickle.dump(data, f)
-        except Exception as e:
-            print(f"Warning: Could not save data: {e}")
+    def _replay_tail(self, shards: List[str]):
+        """Add documents logged after the last index checkpoint from their saved vectors."""
+        start = self.vectorstore.index.ntotal
+        if start >= len(self.documents):
+            return
+        
+        if self._add_saved_vectors(shards, start):
+            self._unsaved = len(self.documents) - start
+    
+    def _add_saved_vectors(self, shards: List[str], start: int) -> bool:
+        """Add documents from start onwards to the index from their saved shard vectors.
+        
+        Shards are mapped and converted one at a time so the corpus is never
+        held in memory as a single float32 matrix. Returns False, without
+        touching the index, if any vector file is missing or out of step.
+        """
+        mapped = self._map_vectors(shards)
+        if mapped is None or sum(len(vectors) for vectors in mapped) != len(self.documents):
+            return False
+        
+        offset = 0
+        for vectors in mapped:
+            end = offset + len(vectors)
+            if end > start:
+                docs = self.documents[max(start, offset):end]
+                self.vectorstore.add_embeddings(
+                    zip([doc.page_content for doc in docs],
+                        np.asarray(vectors[max(start - offset, 0):], dtype=np.float32)),
+                    metadatas=[doc.metadata for doc in docs]
+                )
+            offset = end
+        return True
+    
+    def _map_vectors(self, shards: List[str]) -> Optional[List[np.ndarray]]:
+        """Memory-map the saved float16 vectors of each shard, or None if any are missing."""
+        vector_files = [shard[:-len(".parquet")] + ".npy" for shard in shards]
+        if not all(os.path.exists(path) for path in vector_files):
+            return None
+        return [np.load(path, mmap_mode='r') for path in vector_files]
+    
+    def _saved_vectors(self) -> Optional[np.ndarray]:
+        """Read the vectors of every shard on disk into one float32 matrix, or None if any are missing."""
+        mapped = self._map_vectors(sorted(glob.glob(os.path.join(DOCS_DIR, "docs_*.parquet"))))
+        if mapped is None:
+            return None
+        
+        # Fill a single matrix shard by shard rather than stacking and then converting
+        vectors = np.empty((sum(len(shard) for shard in mapped), EMBED_DIM), dtype=np.float32)
+        offset = 0
+        for shard in mapped:
+            vectors[offset:offset + len(shard)] = shard
+            offset += len(shard)
+        return vectors
+    
+    def _new_vectorstore(self) -> FAISS:
+        """Wrap an empty HNSW index in LangChain's FAISS store."""
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=_make_index(),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+    
+    def _embed_query(self, query: str) -> tuple:
+        """Embed a query once; a tuple so the result is hashable and immutable."""
+        return tuple(self.embeddings.embed_query(query))
+    
+    def _maybe_retrain(self):
+        """Swap the index for a freshly trained IVF-PQ one once it has grown enough."""
+        with self._index_lock:
+            vectorstore = self.vectorstore
+            if vectorstore is None:
+                return
+            ntotal = vectorstore.index.ntotal
+            if ntotal < IVFPQ_MIN_VECTORS or ntotal < 2 * self._trained_size:
+                return
+        
+        # Train on the raw vectors in the shards, not on the index's lossy PQ reconstructions.
+        # This runs on the writer, so every shard it has taken off the queue is on disk;
+        # shards from before vectors were saved can't be retrained on, so keep the index
+        vectors = self._saved_vectors()
+        if vectors is None:
+            return
+        trained_size = len(vectors)
+        new_index = _build_ivfpq(vectors)
+        
+        with self._index_lock:
+            # The knowledge base was cleared or replaced while training
+            if self.vectorstore is not vectorstore:
+                return
+            
+            # Adds made while training are still queued for this writer, in index order,
+            # so their raw vectors catch the new index up; positions are unchanged, so
+            # the docstore mapping still lines up
+            queued = [
+                item[3] for item in self._save_queue.queue
+                if item is not None and item[0] == self._generation
+            ]
+            if trained_size + sum(len(vectors) for vectors in queued) != vectorstore.index.ntotal:
+                return
+            for vectors in queued:
+                new_index.add(np.asarray(vectors, dtype=np.float32))
+            vectorstore.index = new_index
+            self._trained_size = trained_size
+    
+    def _write_shard(self, shard: int, documents: List[Document], vectors: np.ndarray):
+        """Atomically write one Parquet shard of documents and its float16 vectors."""
+        table = pa.table({
+            'text': pa.array([doc.page_content for doc in documents], pa.string()),
+            'source': pa.array(
+                [doc.metadata.get('source') for doc in documents], pa.string()
+            ).dictionary_encode(),
+            'metadata': pa.array(
+                [orjson.dumps(doc.metadata, option=orjson.OPT_SERIALIZE_NUMPY).decode() for doc in documents],
+                pa.string()
+            ),
+            'hash': pa.array([_content_hash(doc.page_content) for doc in documents], pa.binary(16))
+        })
+        os.makedirs(DOCS_DIR, exist_ok=True)
+        path = os.path.join(DOCS_DIR, f"docs_{shard:05d}")
+        
+        # Raw vectors let a lost index be rebuilt from a memory map instead of the model
+        with open(path + ".npy.tmp", 'wb') as f:
+            np.save(f, vectors)
+        os.replace(path + ".npy.tmp", path + ".npy")
+        
+        # The Parquet file lands last, since its presence marks the shard as complete
+        pq.write_table(table, path + ".parquet.tmp")
+        os.replace(path + ".parquet.tmp", path + ".parquet")
+    
+    def _snapshot_index(self, vectorstore: FAISS):
+        """Serialize the index and its position-to-docstore-id mapping in memory."""
+        # Documents live in the shards, so only ids are saved rather than a pickled docstore
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+        return faiss.serialize_index(vectorstore.index), ids
+    
+    def _write_index(self, snapshot):
+        """Atomically write an index snapshot taken by _snapshot_index."""
+        data, ids = snapshot
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(INDEX_FILE + ".tmp", 'wb') as f:
+            f.write(data.tobytes())
+        with open(INDEX_IDS_FILE + ".tmp", 'wb') as f:
+            f.write(orjson.dumps(ids))
+        os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+        os.replace(INDEX_IDS_FILE + ".tmp", INDEX_IDS_FILE)
+    
+    def _checkpoint(self, snapshot, generation: int):
+        """Write an index snapshot unless the knowledge base was cleared since it was taken."""
+        with self._persist_lock:
+            if generation == self._generation:
+                self._write_index(snapshot)
     
-    def add_documents(self, documents: List[Document]) -> Dict[str, Any]:
-        """Add documents to the vector store."""
+    def _read_index(self) -> Optional[FAISS]:
+        """Load the saved index over the loaded documents, or None if it is missing or unusable."""
+        if not (os.path.exists(INDEX_FILE) and os.path.exists(INDEX_IDS_FILE)):
+            return None
+        
+        index = faiss.read_index(INDEX_FILE)
+        with open(INDEX_IDS_FILE, 'rb') as f:
+            ids = orjson.loads(f.read())
+        if len(ids) != index.ntotal or index.ntotal > len(self.documents):
+            return None
+        
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(dict(zip(ids, self.documents))),
+            index_to_docstore_id=dict(enumerate(ids)),
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+        )
+    
+    def _writer(self):
+        """Persist queued shards, saving the index once per burst of adds."""
+        while True:
+            pending = [self._save_queue.get()]
+            while pending[-1] is not None:
+                try:
+                    pending.append(self._save_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            # close() queues None to stop the writer once everything before it is saved
+            stop = pending[-1] is None
+            if stop:
+                pending.pop()
+                self._save_queue.task_done()
+            batch_size = len(pending)
+            
+            try:
+                with self._persist_lock:
+                    pending = [item for item in pending if item[0] == self._generation]
+                    for _, shard, documents, vectors in pending:
+                        self._write_shard(shard, documents, vectors)
+                
+                # Retraining IVF-PQ takes tens of seconds, so it happens here, not in add_documents
+                self._maybe_retrain()
+                
+                # Checkpoint the index so a restart replays only a short tail of the log;
+                # only the in-memory snapshot is taken under the lock, not the disk write
+                snapshot = None
+                with self._index_lock:
+                    self._unsaved += sum(len(documents) for _, _, documents, _ in pending)
+                    if self.vectorstore is not None and self._unsaved >= max(
+                        INDEX_CHECKPOINT_MIN, self.vectorstore.index.ntotal - self._unsaved
+                    ):
+                        snapshot = self._snapshot_index(self.vectorstore)
+                        generation = self._generation
+                        self._unsaved = 0
+                if snapshot is not None:
+                    self._checkpoint(snapshot, generation)
+            except Exception as e:
+                print(f"Warning: Could not save data: {e}")
+            finally:
+                for _ in range(batch_size):
+                    self._save_queue.task_done()
+            if stop:
+                return
+    
+    def _save_data(self, documents: List[Document], embeddings: List[List[float]]):
+        """Queue newly added documents for the background writer."""
+        # One columnar shard per add, so earlier documents are never rewritten
+        vectors = np.asarray(embeddings, dtype=np.float16)
+        self._save_queue.put((self._generation, self._num_shards, documents, vectors))
+        self._num_shards += 1
+    
+    def flush(self):
+        """Block until every queued write has reached disk."""
+        self._save_queue.join()
+    
+    def close(self):
+        """Flush pending writes, checkpoint the index and stop the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        
+        self.flush()
+        snapshot = None
+        with self._index_lock:
+            if self.vectorstore is not None and self._unsaved:
+                snapshot = self._snapshot_index(self.vectorstore)
+                generation = self._generation
+                self._unsaved = 0
+        if snapshot is not None:
+            self._checkpoint(snapshot, generation)
+        self._save_queue.put(None)
+    
+    def _unseen(self, documents: List[Document]) -> List[int]:
+        """Return positions of documents whose text isn't indexed yet, keeping the first of repeats."""
+        fresh, fresh_hashes = [], set()
+        for i, doc in enumerate(documents):
+            h = _content_hash(doc.page_content)
+            if h not in self._seen_hashes and h not in fresh_hashes:
+                fresh_hashes.add(h)
+                fresh.append(i)
+        return fresh
+    
+    def _nothing_added(self) -> Dict[str, Any]:
+        """Result for an add whose chunks were all indexed already."""
+        return {
+            "success": True,
+            "message": "All documents were already in the knowledge base",
+            "chunks_created": 0
+        }
+    
+    def add_documents(self, documents: List[Document], embeddings: Optional[List[List[float]]] = None) -> Dict[str, Any]:
+        """Add documents to the vector store, optionally with precomputed embeddings."""
         try:
             if not documents:
                 return {"success": False, "message": "No documents to add"}
             
-            # Add to documents list
-            self.documents.extend(documents)
+            # Skip chunks whose text is already indexed, including repeats within this batch
+            precomputed = embeddings is not None
+            with self._index_lock:
+                fresh = self._unseen(documents)
+            if not fresh:
+                return self._nothing_added()
+            documents = [documents[i] for i in fresh]
             
-            # Create or update FAISS index
-            texts = [doc.page_content for doc in self.documents]
-            metadatas = [doc.metadata for doc in self.documents]
-            
-            if self.vectorstore is None:
-                self.vectorstore = FAISS.from_texts(
-                    texts, 
-                    self.embeddings, 
-                    metadatas=metadatas
-                )
+            # Only the incoming documents are embedded and indexed; earlier ones already are
+            if precomputed:
+                embeddings = [embeddings[i] for i in fresh]
             else:
-                # Add new documents to existing index
-                new_texts = [doc.page_content for doc in documents]
-                new_metadatas = [doc.metadata for doc in documents]
-                self.vectorstore.add_texts(new_texts, metadatas=new_metadatas)
+                embeddings = self.embeddings.embed_documents([doc.page_content for doc in documents])
             
-            # Save data
-            self._save_data()
+            # Hold off the writer while the index is being modified; documents and shards
+            # are appended under the same lock so their order matches index positions
+            with self._index_lock:
+                # A concurrent add may have indexed some of these chunks while they were embedded
+                fresh = self._unseen(documents)
+                if not fresh:
+                    return self._nothing_added()
+                documents = [documents[i] for i in fresh]
+                embeddings = [embeddings[i] for i in fresh]
+                
+                if self.vectorstore is None:
+                    self.vectorstore = self._new_vectorstore()
+                self.vectorstore.add_embeddings(
+                    zip([doc.page_content for doc in documents], embeddings),
+                    metadatas=[doc.metadata for doc in documents]
+                )
+                
+                # Add to documents list once they are indexed
+                self.documents.extend(documents)
+                self._seen_hashes.update(_content_hash(doc.page_content) for doc in documents)
+                self._source_files.update(doc.metadata['source'] for doc in documents if 'source' in doc.metadata)
+                
+                # Save data
+                self._save_data(documents, embeddings)
             
             return {
                 "success": True,
@@ -93,31 +454,50 @@ class VectorStore:
     
     def similarity_search(self, query: str, k: int = 5) -> List[Document]:
         """Search for similar documents."""
+        # MiniLM is uncased and ignores surrounding whitespace, so this keeps the vector exact
+        embedding = self._cached_embed(query.strip().lower())
+        return self.similarity_search_by_vector(list(embedding), k=k)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 5) -> List[Document]:
+        """Search for similar documents using a precomputed query embedding."""
+        return self.similarity_search_by_vectors([embedding], k=k)[0]
+    
+    def similarity_search_batch(self, queries: List[str], k: int = 5) -> List[List[Document]]:
+        """Search for several queries at once, embedding them in a single model pass."""
+        if not queries:
+            return []
+        return self.similarity_search_by_vectors(self.embeddings.embed_documents(queries), k=k)
+    
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 5) -> List[List[Document]]:
+        """Search for similar documents for each of several query embeddings."""
         try:
-            if self.vectorstore is None:
-                return []
+            queries = np.asarray(embeddings, dtype=np.float32)
             
-            return self.vectorstore.similarity_search(query, k=k)
+            # add_documents grows the index before the id mapping, and FAISS can't search
+            # an index that is being added to, so search and map ids under the index lock
+            with self._index_lock:
+                if self.vectorstore is None:
+                    return [[] for _ in embeddings]
+                
+                # One FAISS call scans the index for the whole (B, d) query matrix
+                _, indices = self.vectorstore.index.search(queries, k)
+                index_to_id = self.vectorstore.index_to_docstore_id
+                docstore = self.vectorstore.docstore
+                # A docstore miss comes back as an error string, so keep only real documents
+                results = [[docstore.search(index_to_id[i]) for i in row if i != -1] for row in indices]
+                return [[doc for doc in row if isinstance(doc, Document)] for row in results]
         except Exception as e:
             print(f"Error in similarity search: {e}")
-            return []
+            return [[] for _ in embeddings]
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store."""
         try:
-            total_documents = len(self.documents)
-            total_chunks = len(self.documents)
-            
-            # Get unique source files
-            source_files = set()
-            for doc in self.documents:
-                if 'source' in doc.metadata:
-                    source_files.add(doc.metadata['source'])
-            
+            # Source files are tracked as documents come and go, so no scan here
             return {
-                "total_documents": len(source_files),
-                "total_chunks": total_chunks,
-                "source_files": list(source_files)
+                "total_documents": len(self._source_files),
+                "total_chunks": len(self.documents),
+                "source_files": list(self._source_files)
             }
         except Exception as e:
             return {
@@ -130,14 +510,40 @@ class VectorStore:
     def clear_all(self) -> Dict[str, Any]:
         """Clear all documents from the vector store."""
         try:
-            self.documents = []
-            self.vectorstore = None
+            # Let pending writes land first; anything queued after this is dropped below
+            self.flush()
             
-            # Remove storage file
-            storage_file = os.path.join(tempfile.gettempdir(), "rag_chatbot_data.pkl")
-            if os.path.exists(storage_file):
-                os.remove(storage_file)
+            # Reset under both locks so no add or write interleaves with the reset; the new
+            # generation makes the writer drop shards and checkpoints from before the clear
+            with self._persist_lock, self._index_lock:
+                self._generation += 1
+                self.vectorstore = None
+                self.documents = []
+                self._source_files = set()
+                self._seen_hashes = set()
+                self._num_shards = 0
+                self._trained_size = 0
+                self._unsaved = 0
+                
+                # Remove stored documents and saved index
+                shutil.rmtree(DOCS_DIR, ignore_errors=True)
+                shutil.rmtree(INDEX_DIR, ignore_errors=True)
             
             return {"success": True, "message": "All documents cleared"}
         except Exception as e:
             return {"success": False, "message": f"Error clearing documents: {str(e)}"}
+
+_VECTOR_STORE = None
+_VECTOR_STORE_LOCK = threading.Lock()
+
+def get_shared_vector_store() -> VectorStore:
+    """Return the process-wide vector store, loading it once.
+    
+    Every store writes numbered shards into the same DOCS_DIR, so a second
+    instance in the same process would overwrite the first one's shards.
+    """
+    global _VECTOR_STORE
+    with _VECTOR_STORE_LOCK:
+        if _VECTOR_STORE is None:
+            _VECTOR_STORE = VectorStore()
+    return _VECTOR_STORE